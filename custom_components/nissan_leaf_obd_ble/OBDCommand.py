@@ -40,6 +40,28 @@ logger = logging.getLogger(__name__)
 class OBDCommand:
     """Commmand object."""
 
+    __slots__ = (
+        "name",
+        "desc",
+        "command",
+        "bytes",
+        "decode",
+        "header",
+        "fast",
+        "_key",
+        "_hash",
+        "_str",
+        "_pad",
+        "_command_str",
+        "_is_hex",
+        "_mode",
+        "_pid",
+    )
+
+    # shared header + command keys, so equal commands hash and compare
+    # against the very same bytes object
+    _KEY_POOL: dict[bytes, bytes] = {}
+
     def __init__(
         self,
         name,
@@ -53,12 +75,32 @@ class OBDCommand:
         """Initialise."""
         self.name = name  # human readable name (also used as key in commands dict)
         self.desc = desc  # human readable description
-        self.command = command  # command string
+        self.command = bytes(command)  # command string
         self.bytes = _bytes  # number of bytes expected in return
         self.decode = decoder  # decoding function
-        self.header = header  # header used for the queries
+        self.header = bytes(header)  # header used for the queries
         self.fast = fast  # can an extra digit be added to the end of the command? (to make the ELM return early)
 
+        # commands are immutable once built, so work out everything that is
+        # needed for dict lookups and logging up front
+        key = self.header + self.command
+        self._key = OBDCommand._KEY_POOL.setdefault(key, key)
+        self._hash = hash(self._key)
+        self._str = f"{self._key.decode(errors='replace')}: {desc}"
+        self._pad = b"\x00" * _bytes
+        try:
+            self._command_str = self.command.decode()
+            self._is_hex = isHex(self._command_str)
+        except UnicodeDecodeError:
+            self._command_str = ""
+            self._is_hex = False
+        self._mode = None
+        self._pid = None
+        if self._is_hex and len(self.command) >= 2:
+            self._mode = int(self._command_str[:2], 16)
+        if self._is_hex and len(self.command) > 2:
+            self._pid = int(self._command_str[2:], 16)
+
     def clone(self):
         """Copy constructor."""
         return OBDCommand(
@@ -74,16 +116,12 @@ class OBDCommand:
     @property
     def mode(self):
         """Return the mode."""
-        if len(self.command) >= 2 and isHex(self.command.decode()):
-            return int(self.command[:2], 16)
-        return None
+        return self._mode
 
     @property
     def pid(self):
         """Return the pid."""
-        if len(self.command) > 2 and isHex(self.command.decode()):
-            return int(self.command[2:], 16)
-        return None
+        return self._pid
 
     def __call__(self, messages):
         """Decode the message with the relevant decoder."""
@@ -97,36 +135,41 @@ class OBDCommand:
         if messages:
             r.value = self.decode(messages)
         else:
-            logger.info("%s did not receive any acceptable messages", str(self))
+            logger.info("%s did not receive any acceptable messages", self)
 
         return r
 
     def __constrain_message_data(self, message):
         """Pad or chop the data field to the size specified by this command."""
+        nbytes = self.bytes
+        if nbytes <= 0:
+            return
         len_msg_data = len(message.data)
-        if self.bytes > 0:
-            if len_msg_data > self.bytes:
-                # chop off the right side
-                message.data = message.data[: self.bytes]
-                logger.debug(
-                    "Message was longer than expected (%s>%s). Trimmed message: %s",
-                    len_msg_data,
-                    self.bytes,
-                    repr(message.data),
-                )
-            elif len_msg_data < self.bytes:
-                # pad the right with zeros
-                message.data += b"\x00" * (self.bytes - len_msg_data)
-                logger.debug(
-                    "Message was shorter than expected (%s<%s). Padded message: %s",
-                    len_msg_data,
-                    self.bytes,
-                    repr(message.data),
-                )
+        if len_msg_data == nbytes:
+            # the common case, nothing to do
+            return
+        if len_msg_data > nbytes:
+            # chop off the right side
+            message.data = message.data[:nbytes]
+            logger.debug(
+                "Message was longer than expected (%s>%s). Trimmed message: %r",
+                len_msg_data,
+                nbytes,
+                message.data,
+            )
+        else:
+            # pad the right with zeros
+            message.data += self._pad[: nbytes - len_msg_data]
+            logger.debug(
+                "Message was shorter than expected (%s<%s). Padded message: %r",
+                len_msg_data,
+                nbytes,
+                message.data,
+            )
 
     def __str__(self):
         """Return string representation of command."""
-        return str(f"{self.header + self.command}: {self.desc}")
+        return self._str
 
     def __repr__(self):
         """Return representation of the command."""
@@ -142,10 +185,11 @@ class OBDCommand:
     def __hash__(self):
         """Return the hash of the command."""
         # needed for using commands as keys in a dict (see async.py)
-        return hash(self.header + self.command)
+        return self._hash
 
     def __eq__(self, other):
         """Equals check."""
         if isinstance(other, OBDCommand):
-            return self.command == other.command and self.header == other.header
+            # the header check keeps b"79" + b"70210" distinct from b"797" + b"0210"
+            return self._key == other._key and self.header == other.header
         return False
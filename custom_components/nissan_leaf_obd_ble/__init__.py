@@ -58,6 +58,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     ) -> None:
         """Handle re-discovery of the device."""
         _LOGGER.debug("New service_info: %s - %s", service_info, change)
+        coordinator.async_device_seen()
         # have just discovered the device is back in range - ping the coordinator to update immediately
         hass.async_create_task(coordinator.async_request_refresh())
 
@@ -71,6 +72,20 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         )  # does the register callback, and returns a cancel callback for cleanup
     )
 
+    @callback
+    def _async_specific_device_lost(
+        service_info: bluetooth.BluetoothServiceInfoBleak,
+    ) -> None:
+        """Handle the device dropping out of range."""
+        _LOGGER.debug("Lost service_info: %s", service_info)
+        coordinator.async_device_lost()
+
+    entry.async_on_unload(
+        bluetooth.async_track_unavailable(
+            hass, _async_specific_device_lost, address, connectable=True
+        )
+    )
+
     async def update_options_listener(hass: HomeAssistant | None, entry: ConfigEntry):
         """Handle options update."""
         coordinator.options = entry.options
@@ -2,6 +2,7 @@
 
 import asyncio
 import logging
+import time
 
 from bleak import BleakClient, BleakError
 from bleak.backends.device import BLEDevice
@@ -9,44 +10,100 @@ from bleak.backends.device import BLEDevice
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
+# smallest ATT MTU every BLE link supports, minus the 3 byte ATT header
+DEFAULT_MTU = 20
+
+# consumed bytes at the front of the receive buffer are only discarded once
+# there are at least this many of them (and they make up over half the buffer)
+RX_COMPACT_THRESHOLD = 4096
+
+# most unread bytes kept in the receive buffer, older bytes are dropped
+MAX_RX_BUFFER = 65536
+
+# minimum number of seconds between receive buffer overflow warnings
+RX_OVERFLOW_LOG_INTERVAL = 1.0
+
 
 class bleserial:
     """Encapsulates the ble connection and make it appear something like a UART port."""
 
-    __buffer = bytearray()
-
     def __init__(
         self,
         device: BLEDevice,
         service_uuid,
         characteristic_uuid_read,
         characteristic_uuid_write,
+        mtu=DEFAULT_MTU,
     ) -> None:
         """Initialise."""
         self.device = device
         self.service_uuid = service_uuid
-        self.characteristic_uuid_read = characteristic_uuid_read
-        self.characteristic_uuid_write = characteristic_uuid_write
+        self.characteristic_uuid_read = characteristic_uuid_read.lower()
+        self.characteristic_uuid_write = characteristic_uuid_write.lower()
         self.client = None
         self._rx_buffer = bytearray()
+        self._rx_head = 0
+        self._scan_from = 0  # everything before here is known to hold no newline
+        self._max_buffer = MAX_RX_BUFFER
+        self._last_overflow_log = 0.0
+        self._data_event = asyncio.Event()
         self._timeout = None
         self._write_timeout = None
         self._notifications_started = False
         self._read_char = None
         self._write_char = None
+        self._write_response = True
+        self._mtu = mtu
+        # keeps the chunks of concurrent writes from interleaving on the wire
+        self._write_lock = asyncio.Lock()
 
     async def _wait_for_data(self, size):
-        while len(self._rx_buffer) < size:
-            await asyncio.sleep(0.01)
+        while len(self._rx_buffer) - self._rx_head < size:
+            self._data_event.clear()
+            await self._data_event.wait()
 
     async def _wait_for_line(self):
-        while b"\n" not in self._rx_buffer:
-            await asyncio.sleep(0.01)
+        """Wait for a newline and return its index in the receive buffer."""
+        while True:
+            index = self._rx_buffer.find(b"\n", max(self._scan_from, self._rx_head))
+            if index != -1:
+                return index
+            self._scan_from = len(self._rx_buffer)
+            self._data_event.clear()
+            await self._data_event.wait()
+
+    def _consume(self, size):
+        """Take size bytes from the front of the receive buffer."""
+        head = self._rx_head
+        data = bytes(memoryview(self._rx_buffer)[head : head + size])
+        head += size
+        if head >= len(self._rx_buffer):
+            self._rx_buffer.clear()
+            self._scan_from = 0
+            head = 0
+        elif head > RX_COMPACT_THRESHOLD and head > len(self._rx_buffer) // 2:
+            del self._rx_buffer[:head]
+            self._scan_from = max(0, self._scan_from - head)
+            head = 0
+        self._rx_head = head
+        return data
+
+    def _drain(self):
+        """Take everything from the receive buffer."""
+        if self._rx_head:
+            return self._consume(len(self._rx_buffer) - self._rx_head)
+        # nothing has been consumed, so hand over the buffer instead of copying it
+        data = self._rx_buffer
+        self._rx_buffer = bytearray()
+        self._scan_from = 0
+        return data
 
     def reset_input_buffer(self):
         """Reset the input buffer."""
         logger.debug("Resetting input buffer")
         self._rx_buffer.clear()
+        self._rx_head = 0
+        self._scan_from = 0
 
     def reset_output_buffer(self):
         """Reset the output buffer."""
@@ -61,7 +118,7 @@ class bleserial:
     @property
     def in_waiting(self):
         """Return the number of bytes in the receive buffer."""
-        return len(self._rx_buffer)
+        return len(self._rx_buffer) - self._rx_head
 
     @property
     def timeout(self):
@@ -87,6 +144,24 @@ class bleserial:
         """Handle when a GATT notification arrives."""
         logger.debug("Notification received: %s", data)
         self._rx_buffer.extend(data)
+        if len(self._rx_buffer) - self._rx_head > self._max_buffer:
+            self._drop_oldest()
+        self._data_event.set()
+
+    def _drop_oldest(self):
+        """Trim the unread part of the receive buffer back to its maximum size."""
+        del self._rx_buffer[: self._rx_head]
+        self._scan_from = max(0, self._scan_from - self._rx_head)
+        self._rx_head = 0
+        overflow = len(self._rx_buffer) - self._max_buffer
+        if overflow <= 0:
+            return
+        del self._rx_buffer[:overflow]
+        self._scan_from = max(0, self._scan_from - overflow)
+        now = time.monotonic()
+        if now - self._last_overflow_log >= RX_OVERFLOW_LOG_INTERVAL:
+            self._last_overflow_log = now
+            logger.warning("Receive buffer full, dropped %s unread bytes", overflow)
 
     async def open(self):
         """Open the port."""
@@ -96,22 +171,13 @@ class bleserial:
             await self.client.connect()
             logger.debug("Connected to device: %s", self.device)
 
-            services = await self.client.get_services()
+            services = self.client.services
             service = services.get_service(self.service_uuid)
             read_char = None
             write_char = None
             if service:
-                for char in service.characteristics:
-                    if (
-                        self.characteristic_uuid_read.lower() == char.uuid.lower()
-                        and read_char is None
-                    ):
-                        read_char = char
-                    if (
-                        self.characteristic_uuid_write.lower() == char.uuid.lower()
-                        and write_char is None
-                    ):
-                        write_char = char
+                read_char = service.get_characteristic(self.characteristic_uuid_read)
+                write_char = service.get_characteristic(self.characteristic_uuid_write)
             if read_char is None or write_char is None:
                 raise BleakError("Unable to locate GATT characteristics")
 
@@ -122,6 +188,10 @@ class bleserial:
             await self.client.start_notify(read_char.handle, self._notification_handler)
             self._read_char = read_char
             self._write_char = write_char
+            # the replies arrive as notifications, so skip the ATT write
+            # acknowledgement whenever the characteristic allows it
+            self._write_response = "write-without-response" not in write_char.properties
+            self._mtu = max(self._mtu, self.client.mtu_size - 3)
             self._notifications_started = True
             logger.debug("Notifications started")
         except BleakError as e:
@@ -149,32 +219,49 @@ class bleserial:
                 logger.debug("Client already disconnected")
             self.client = None
 
-    async def write(self, data):
-        """Write bytes."""
+    async def write(self, data, response=None):
+        """Write bytes.
+
+        By default the write is acknowledged only if the characteristic does
+        not support write-without-response; pass response=True to force it.
+        """
         if isinstance(data, str):
             data = data.encode()
+        if response is None:
+            response = self._write_response
         try:
             logger.info(
                 "Writing data to characteristic UUID: %s Data: %s",
                 self.characteristic_uuid_write,
                 data,
             )
-            await self.client.write_gatt_char(self._write_char.handle, data)
+            mtu = self._mtu
+            async with self._write_lock:
+                for i in range(0, len(data), mtu):
+                    await self.client.write_gatt_char(
+                        self._write_char.handle,
+                        data[i : i + mtu],
+                        response=response,
+                    )
             logger.debug("Data written")
         except BleakError as e:
             logger.error("Failed to write data: %s", e)
             raise
 
     async def read(self, size=1):
-        """Read from the buffer."""
+        """Read from the buffer.
+
+        A negative size waits for any data, and returns all of it
+        (possibly as a bytearray).
+        """
         try:
             logger.debug("Reading %s bytes of data", size)
-            while len(self._rx_buffer) < size:
-                await asyncio.sleep(0.01)
-            data = self._rx_buffer[:size]
-            self._rx_buffer = self._rx_buffer[size:]
-            logger.debug("Read data: %s", data)
-            return bytes(data)
+            async with asyncio.timeout(self._timeout):
+                await self._wait_for_data(max(size, 1))
+            data = self._drain() if size < 0 else self._consume(size)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Read data: %s", data)
+            return data
         except Exception as e:
             logger.error("Failed to read data: %s", e)
             raise
@@ -183,12 +270,13 @@ class bleserial:
         """Read a whole line from the buffer."""
         try:
             logger.debug("Reading line")
-            await asyncio.wait_for(self._wait_for_line(), timeout=self._timeout)
-            index = self._rx_buffer.index(b"\n") + 1
-            data = self._rx_buffer[:index]
-            self._rx_buffer = self._rx_buffer[index:]
-            logger.debug("Read line: %s", data)
-            return bytes(data)
+            async with asyncio.timeout(self._timeout):
+                index = await self._wait_for_line()
+            data = self._consume(index + 1 - self._rx_head)
+            self._scan_from = self._rx_head
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Read line: %s", data)
+            return data
         except TimeoutError as e:
             logger.error("Readline operation timed out")
             raise BleakError("Readline operation timed out") from e
@@ -1,11 +1,12 @@
 """Coodinator for Nissan Leaf OBD BLE."""
 
+import asyncio
 from datetime import timedelta
 import logging
 from typing import Any
 
 from homeassistant.components.bluetooth.api import async_address_present
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
 from .api import NissanLeafObdBleApiClient
@@ -32,6 +33,13 @@ ULTRA_SLOW_POLL_INTERVAL = timedelta(hours=1)
 class NissanLeafObdBleDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching data from the API."""
 
+    _OPTION_DEFAULTS = {
+        "cache_values": False,
+        "fast_poll": int(FAST_POLL_INTERVAL.total_seconds()),
+        "slow_poll": int(SLOW_POLL_INTERVAL.total_seconds()),
+        "xs_poll": int(ULTRA_SLOW_POLL_INTERVAL.total_seconds()),
+    }
+
     def __init__(
         self, hass: HomeAssistant, address: str, api: NissanLeafObdBleApiClient, options
     ) -> None:
@@ -45,39 +53,59 @@ class NissanLeafObdBleDataUpdateCoordinator(DataUpdateCoordinator):
         )
         self._address = address
         self.api = api
-        self._cache_data: dict[str, Any] = {}
-        self.cache_data = {}
+        self.cache_data: dict[str, Any] = {}
+        # in-progress api.async_get_data(), shared by overlapping updates
+        self._inflight: asyncio.Task | None = None
+        # kept up to date by the bluetooth callbacks registered in __init__.py
+        self._present = async_address_present(hass, address, connectable=True)
         self.options = options
 
+    @callback
+    def async_device_seen(self) -> None:
+        """Record that an advertisement from the device has been received."""
+        self._present = True
+
+    @callback
+    def async_device_lost(self) -> None:
+        """Record that the device has stopped advertising."""
+        self._present = False
+
     async def _async_update_data(self) -> dict[str, Any]:
         """Update data via library."""
 
         # Check if the device is still available
         _LOGGER.debug("Check if the device is still available to connect")
-        available = async_address_present(self.hass, self._address, connectable=True)
-        if not available:
+        if not self._present:
             # Device out of range? Switch to active polling interval for when it reappears
             _LOGGER.debug("Car out of range? Switch to extra slow polling")
-            self.update_interval = timedelta(seconds=self._xs_poll_interval)
+            self.update_interval = self._xs_td
             _LOGGER.debug(
                 "Car out of range? Switch to ultra slow polling: interval = %s",
                 self.update_interval,
             )
-            if self.options["cache_values"]:
-                return self._cache_data
+            if self._cache_enabled:
+                return dict(self.cache_data)
             return {}
 
         try:
-            new_data = await self.api.async_get_data()
+            if self._inflight is None or self._inflight.done():
+                self._inflight = self.hass.async_create_task(self.api.async_get_data())
+            inflight = self._inflight
+            try:
+                new_data = await asyncio.shield(inflight)
+            finally:
+                # a cancelled caller must not drop a poll that is still running
+                if inflight.done() and self._inflight is inflight:
+                    self._inflight = None
             if len(new_data) == 0:
                 # Car is probably off. Switch to slow polling inteval
-                self.update_interval = timedelta(seconds=self._slow_poll_interval)
+                self.update_interval = self._slow_td
                 _LOGGER.debug(
                     "Car is probably off, switch to slow polling: interval = %s",
                     self.update_interval,
                 )
             else:
-                self.update_interval = timedelta(seconds=self._fast_poll_interval)
+                self.update_interval = self._fast_td
                 _LOGGER.debug(
                     "Car is on, polling: interval = %s",
                     self.update_interval,
@@ -85,7 +113,7 @@ class NissanLeafObdBleDataUpdateCoordinator(DataUpdateCoordinator):
         except Exception as err:
             raise UpdateFailed(f"Unable to fetch data: {err}") from err
         else:
-            if self.options["cache_values"]:
+            if self._cache_enabled:
                 self.cache_data.update(new_data)
                 return self.cache_data
             return new_data
@@ -98,13 +126,11 @@ class NissanLeafObdBleDataUpdateCoordinator(DataUpdateCoordinator):
     @options.setter
     def options(self, options):
         """Set the configuration options."""
-        defaults = {
-            "cache_values": False,
-            "fast_poll": int(FAST_POLL_INTERVAL.total_seconds()),
-            "slow_poll": int(SLOW_POLL_INTERVAL.total_seconds()),
-            "xs_poll": int(ULTRA_SLOW_POLL_INTERVAL.total_seconds()),
-        }
-        self._options = {**defaults, **(options or {})}
-        self._fast_poll_interval = self._options["fast_poll"]
-        self._slow_poll_interval = self._options["slow_poll"]
-        self._xs_poll_interval = self._options["xs_poll"]
+        opts = NissanLeafObdBleDataUpdateCoordinator._OPTION_DEFAULTS.copy()
+        if options:
+            opts.update(options)
+        self._options = opts
+        self._fast_td = timedelta(seconds=self._options["fast_poll"])
+        self._slow_td = timedelta(seconds=self._options["slow_poll"])
+        self._xs_td = timedelta(seconds=self._options["xs_poll"])
+        self._cache_enabled = self._options["cache_values"]
@@ -31,6 +31,7 @@
 ########################################################################
 
 import asyncio
+from enum import IntEnum
 import logging
 import re
 
@@ -43,24 +44,62 @@ from .protocols.protocol_can import ISO_15765_4_11bit_500k
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
+# the reply to 'AT RV', i.e. "12.6V"
+_RV_RE = re.compile(r"(\d+(?:\.\d*)?)V?", re.IGNORECASE)
 
-class OBDStatus:
+
+class OBDStatus(IntEnum):
     """Values for the connection status flags."""
 
-    NOT_CONNECTED = "Not Connected"
-    ELM_CONNECTED = "ELM Connected"
-    OBD_CONNECTED = "OBD Connected"
-    CAR_CONNECTED = "Car Connected"
+    NOT_CONNECTED = 0
+    ELM_CONNECTED = 1
+    OBD_CONNECTED = 2
+    CAR_CONNECTED = 3
+
+    def __str__(self) -> str:
+        """Return the human readable status."""
+        return _OBD_STATUS_NAMES[self]
+
+
+_OBD_STATUS_NAMES = ("Not Connected", "ELM Connected", "OBD Connected", "Car Connected")
 
 
 class ELM327:
     """Handles communication with the ELM327 adapter."""
 
+    __slots__ = (
+        "__status",
+        "__low_power",
+        "__stale_input",
+        "timeout",
+        "__port",
+        "__protocol",
+        "__rx_buf",
+    )
+
     # chevron (ELM prompt character)
     ELM_PROMPT = b">"
     # an 'OK' which indicates we are entering low power state
     ELM_LP_ACTIVE = b"OK"
 
+    # configuration sent after the reset: echo OFF, protocol 6, headers ON,
+    # linefeeds OFF, printing spaces OFF, CAN automatic formatting OFF
+    ELM_INIT_COMMANDS = (b"ATE0", b"ATSP6", b"ATH1", b"ATL0", b"ATS0", b"ATCAF0")
+    # seconds per command to wait for the answers to a batched write; an
+    # adapter that drops the rest of the batch should not cost the full timeout
+    ELM_BATCH_TIMEOUT = 0.2
+    # seconds to wait for the adapter to finish responding
+    ELM_READ_TIMEOUT = 5
+    # initial size of the buffer responses are collected in
+    ELM_RX_BUFFER_SIZE = 4096
+    # write commands unacknowledged when the adapter allows it; the prompt
+    # that ends every response already tells us the command arrived
+    USE_WRITE_WITHOUT_RESPONSE = True
+
+    # addresses of adapters that failed the batched initialisation, which are
+    # sent the init commands one at a time on every later connection
+    _no_batch_init: set[str] = set()
+
     # GATT UUIDs specifically for LeLink OBD BLE dongle
     SERVICE_UUID = "0000ffe0-0000-1000-8000-00805f9b34fb"
     CHARACTERISTIC_UUID_READ = "0000ffe1-0000-1000-8000-00805f9b34fb"
@@ -76,6 +115,15 @@ class ELM327:
     NUS_CHARACTERISTIC_UUID_READ = "6e400003-b5a3-f393-e0a9-e50e24dcca9e"
     NUS_CHARACTERISTIC_UUID_WRITE = "6e400002-b5a3-f393-e0a9-e50e24dcca9e"
 
+    # read and write characteristics for the services other than LeLink
+    _UUID_MAP = {
+        NUS_SERVICE_UUID: (NUS_CHARACTERISTIC_UUID_READ, NUS_CHARACTERISTIC_UUID_WRITE),
+        VEEPEAK_SERVICE_UUID: (
+            VEEPEAK_CHARACTERISTIC_UUID_READ,
+            VEEPEAK_CHARACTERISTIC_UUID_WRITE,
+        ),
+    }
+
     def __init__(
         self,
         device: BLEDevice,
@@ -87,6 +135,8 @@ class ELM327:
         """Initialise."""
         self.__status = OBDStatus.NOT_CONNECTED
         self.__low_power = False
+        # set when the input may still hold the end of an unread response
+        self.__stale_input = False
         self.timeout = timeout
         self.__port = bleserial(
             device,
@@ -95,6 +145,8 @@ class ELM327:
             characteristic_uuid_write,
         )
         self.__protocol = ISO_15765_4_11bit_500k()
+        # reused by every __read_raw(); reads are serialised by the single port
+        self.__rx_buf = bytearray(self.ELM_RX_BUFFER_SIZE)
 
     @classmethod
     async def create(
@@ -106,20 +158,17 @@ class ELM327:
         start_low_power=False,
     ):
         """Initialize ELM327."""
-        uuids = [u.lower() for u in (device.metadata or {}).get("uuids", [])]
-
         service_uuid = cls.SERVICE_UUID
         characteristic_uuid_read = cls.CHARACTERISTIC_UUID_READ
         characteristic_uuid_write = cls.CHARACTERISTIC_UUID_WRITE
 
-        if cls.NUS_SERVICE_UUID in uuids:
-            service_uuid = cls.NUS_SERVICE_UUID
-            characteristic_uuid_read = cls.NUS_CHARACTERISTIC_UUID_READ
-            characteristic_uuid_write = cls.NUS_CHARACTERISTIC_UUID_WRITE
-        elif cls.VEEPEAK_SERVICE_UUID in uuids:
-            service_uuid = cls.VEEPEAK_SERVICE_UUID
-            characteristic_uuid_read = cls.VEEPEAK_CHARACTERISTIC_UUID_READ
-            characteristic_uuid_write = cls.VEEPEAK_CHARACTERISTIC_UUID_WRITE
+        for uuid in (device.metadata or {}).get("uuids", ()):
+            uuid = uuid.lower()
+            characteristics = cls._UUID_MAP.get(uuid)
+            if characteristics is not None:
+                service_uuid = uuid
+                characteristic_uuid_read, characteristic_uuid_write = characteristics
+                break
 
         self = cls(
             device,
@@ -147,6 +196,7 @@ class ELM327:
         if start_low_power:
             await self.__write(b" ")
             await asyncio.sleep(1)
+            self.__stale_input = True  # the wake up response is never read
 
         # ---------------------------- ATZ (reset) ----------------------------
         try:
@@ -156,64 +206,82 @@ class ELM327:
             await self.__error(e)
             return self
 
+        # ---------- ATE0, ATSP6, ATH1, ATL0, ATS0, ATCAF0 (one write) ----------
+        batched = device.address not in self._no_batch_init
+        if batched and not await self.__send_batch(self.ELM_INIT_COMMANDS):
+            # not every adapter copes with several commands in one write,
+            # so repeat them one at a time, which also tells us which one failed
+            logger.debug("Batched initialisation failed, sending commands one by one")
+            self._no_batch_init.add(device.address)
+            batched = False
+        if not batched and not await self.__init_one_by_one():
+            return self
+
+        # by now, we've successfully communicated with the ELM, but not the car
+        self.__status = OBDStatus.ELM_CONNECTED
+
+        # -------------------------- AT RV (read volt) ------------------------
+        if check_voltage:
+            r = await self.__send(b"AT RV")
+            if not r or len(r) != 1 or r[0] == "":
+                await self.__error("No answer from 'AT RV'")
+                return self
+            m = _RV_RE.fullmatch(r[0])
+            if m is None:
+                await self.__error("Incorrect response from 'AT RV'")
+                return self
+            if float(m.group(1)) < 6:
+                logger.error("OBD2 socket disconnected")
+                return self
+            # by now, we've successfully connected to the OBD socket
+            self.__status = OBDStatus.OBD_CONNECTED
+
+        # try to communicate with the car, and load the correct protocol parser
+        self.__status = OBDStatus.CAR_CONNECTED
+        return self
+
+    async def __init_one_by_one(self):
+        """Send the initialisation commands individually.
+
+        returns False (after closing the port) if any of them fails
+        """
         # -------------------------- ATE0 (echo OFF) --------------------------
         r = await self.__send(b"ATE0")
         if not self.__isok(r, expectEcho=True):
             await self.__error("ATE0 did not return 'OK'")
-            return self
+            return False
 
         # ------------------------ ATSP6 (set protocol 6) ---------------------
         r = await self.__send(b"ATSP6")
         if not self.__isok(r):
             await self.__error("ATSP6 did not return 'OK'")
-            return self
+            return False
 
         # ------------------------- ATH1 (headers ON) -------------------------
         r = await self.__send(b"ATH1")
         if not self.__isok(r):
             await self.__error("ATH1 did not return 'OK', or echoing is still ON")
-            return self
+            return False
 
         # ------------------------ ATL0 (linefeeds OFF) -----------------------
         r = await self.__send(b"ATL0")
         if not self.__isok(r):
             await self.__error("ATL0 did not return 'OK'")
-            return self
+            return False
 
         # ------------------------ ATS0 (printing spaces OFF)------------------
         r = await self.__send(b"ATS0")
         if not self.__isok(r):
             await self.__error("ATS0 did not return 'OK'")
-            return self
+            return False
 
         # ----------------- ATCAF0 (CAN automatic formatting OFF)--------------
         r = await self.__send(b"ATCAF0")
         if not self.__isok(r):
             await self.__error("ATCAF0 did not return 'OK'")
-            return self
-
-        # by now, we've successfully communicated with the ELM, but not the car
-        self.__status = OBDStatus.ELM_CONNECTED
-
-        # -------------------------- AT RV (read volt) ------------------------
-        if check_voltage:
-            r = await self.__send(b"AT RV")
-            if not r or len(r) != 1 or r[0] == "":
-                await self.__error("No answer from 'AT RV'")
-                return self
-            try:
-                if float(r[0].lower().replace("v", "")) < 6:
-                    logger.error("OBD2 socket disconnected")
-                    return self
-            except ValueError:
-                await self.__error("Incorrect response from 'AT RV'")
-                return self
-            # by now, we've successfully connected to the OBD socket
-            self.__status = OBDStatus.OBD_CONNECTED
+            return False
 
-        # try to communicate with the car, and load the correct protocol parser
-        self.__status = OBDStatus.CAR_CONNECTED
-        return self
+        return True
 
     def __isok(self, lines, expectEcho=False):
         if not lines:
@@ -224,8 +292,17 @@ class ELM327:
             return self.__has_message(lines, "OK")
         return len(lines) == 1 and lines[0] == "OK"
 
+    def __isok_bytes(self, raw, expectEcho=False):
+        """Check a raw response for 'OK' without decoding it into lines."""
+        raw = raw.strip()
+        if raw == b"OK":
+            return True
+        # with echo still on the command comes first, on a line of its own
+        return expectEcho and raw.endswith((b"\rOK", b"\nOK"))
+
     def __has_message(self, lines, text):
-        return any(text in line for line in lines)
+        # the ELM always sends status messages like 'OK' on a line of their own
+        return text in lines
 
     async def __error(self, msg):
         """Handle fatal failures, print logger.info info and closes serial."""
@@ -329,8 +406,10 @@ class ELM327:
         if self.__low_power:
             await self.normal_power()
 
-        lines = await self.__send(cmd)
-        return self.__protocol(lines)
+        # hand the raw response to the protocol, which splits it into lines
+        # as it parses them
+        await self.__write(cmd)
+        return self.__protocol(await self.__read_raw())
 
     async def __send(self, cmd, delay=None, end_marker=ELM_PROMPT):
         """Unprotected send() function.
@@ -342,30 +421,55 @@ class ELM327:
         """
         await self.__write(cmd)
 
-        delayed = 0.0
         if delay is not None:
             logger.debug("wait: %d seconds", delay)
             await asyncio.sleep(delay)
-            delayed += delay
 
-        r = await self.__read(end_marker=end_marker)
-        while delayed < 1.0 and len(r) <= 0:
-            d = 0.1
-            logger.debug("no response; wait: %f seconds", d)
-            await asyncio.sleep(d)
-            delayed += d
-            r = await self.__read(end_marker=end_marker)
-        return r
+        # __read waits for the first byte itself, so one call gets the
+        # whole response
+        return await self.__read(end_marker=end_marker)
+
+    async def __send_batch(self, cmds):
+        """Send several commands in a single write.
+
+        returns True if every command answered 'OK'
+        """
+        await self.__write(b"\r".join(cmds))
+        raw = await self.__read_raw(
+            count=len(cmds), timeout=self.ELM_BATCH_TIMEOUT * len(cmds)
+        )
+
+        # none of the commands contain 'OK', so enough of them means success
+        if raw.count(b"OK") >= len(cmds):
+            return True
+
+        # find the first command that failed, for the log
+        # every response but the last one still ends with a prompt
+        responses = raw.split(self.ELM_PROMPT)
+        for cmd, r in zip(cmds, responses):
+            if not self.__isok_bytes(r, expectEcho=True):
+                logger.debug("%r did not return 'OK': %r", cmd, r)
+                break
+        else:
+            logger.debug("No answer to %r", cmds[len(responses) :])
+        return False
 
     async def __write(self, cmd):
         """Low-level function to write a string to the port."""
 
         if self.__port:
             cmd += b"\r"  # terminate with carriage return in accordance with ELM327 and STN11XX specifications
-            logger.debug("write: " + repr(cmd))
+            logger.debug("write: %r", cmd)
             try:
-                self.__port.reset_input_buffer()  # dump everything in the input buffer
-                await self.__port.write(cmd)  # turn the string into bytes and write
+                if self.__stale_input:
+                    # dump what is left of the previous response; otherwise
+                    # the prompt based framing of __read() keeps the input aligned
+                    self.__port.reset_input_buffer()
+                    self.__stale_input = False
+                # None lets the port pick write-without-response if supported
+                await self.__port.write(
+                    cmd, response=None if self.USE_WRITE_WITHOUT_RESPONSE else True
+                )
                 # self.__port.flush()  # wait for the output buffer to finish transmitting
             except Exception as e:
                 logger.critical("Device disconnected while writing: %s", e)
@@ -376,55 +480,87 @@ class ELM327:
         else:
             logger.info("cannot perform __write() when unconnected")
 
-    async def __read(self, end_marker=ELM_PROMPT):
+    async def __read(self, end_marker=ELM_PROMPT, count=1):
+        """Low-level read function.
+
+        returns the response from __read_raw() as a list of
+        [/r/n] delimited strings
+        """
+        return self.__split_lines(await self.__read_raw(end_marker, count))
+
+    async def __read_raw(
+        self, end_marker=ELM_PROMPT, count=1, timeout=ELM_READ_TIMEOUT
+    ):
         """Low-level read function.
 
         accumulates characters until the end marker (by
-        default, the prompt character) is seen
-        returns a list of [/r/n] delimited strings
+        default, the prompt character) has been seen count times,
+        or until timeout seconds have passed
+        returns the received bytes, without null characters or
+        the final prompt
         """
         if not self.__port:
             logger.info("cannot perform __read() when unconnected")
-            return []
-
-        buffer = bytearray()
+            return b""
 
-        while True:
-            # retrieve as much data as possible
-            try:
-                data = await self.__port.read(self.__port.in_waiting or 1)
-            except Exception:
-                self.__status = OBDStatus.NOT_CONNECTED
-                await self.__port.close()
-                self.__port = None
-                logger.critical("Device disconnected while reading")
-                return []
-
-            # if nothing was received
-            if not data:
-                logger.warning("Failed to read port")
-                break
+        buffer = self.__rx_buf
+        length = 0  # number of bytes of buffer holding this response
+        seen = 0  # number of end markers received so far
 
-            buffer.extend(data)
-
-            # end on specified end-marker sequence
-            if end_marker in buffer:
-                break
+        try:
+            async with asyncio.timeout(timeout):
+                while True:
+                    # wait for the next notification, and take everything received
+                    try:
+                        data = await self.__port.read(-1)
+                    except Exception:
+                        self.__status = OBDStatus.NOT_CONNECTED
+                        await self.__port.close()
+                        self.__port = None
+                        logger.critical("Device disconnected while reading")
+                        return b""
+
+                    # only search the new data (and any marker split across
+                    # notifications), not the whole response again
+                    start = max(0, length - len(end_marker) + 1)
+                    # overwrites in place, only growing the buffer when it is full
+                    buffer[length : length + len(data)] = data
+                    length += len(data)
+
+                    # end on specified end-marker sequence
+                    seen += buffer.count(end_marker, start, length)
+                    if seen >= count:
+                        break
+        except TimeoutError:
+            logger.warning("Timed out waiting for a response")
+            self.__stale_input = True
+
+        if end_marker != self.ELM_PROMPT:
+            # the prompt (and possibly more) is still to come
+            self.__stale_input = True
+
+        # copy the response out, since the buffer is reused by the next read
+        response = buffer[:length]
 
         # log, and remove the "bytearray(   ...   )" part
-        logger.debug("read: " + repr(buffer)[10:-1])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("read: %s", repr(response)[10:-1])
 
-        # clean out any null characters
-        buffer = re.sub(b"\x00", b"", buffer)
+        # clean out any null characters (rarely sent, so skip the copy if none)
+        if b"\x00" in response:
+            response = response.translate(None, b"\x00")
 
-        # remove the prompt character
-        if buffer.endswith(self.ELM_PROMPT):
-            buffer = buffer[:-1]
+        # remove the prompt character, in place
+        if response.endswith(self.ELM_PROMPT):
+            del response[-len(self.ELM_PROMPT) :]
 
-        # convert bytes into a standard string
-        string = buffer.decode("utf-8", "ignore")
+        return response
 
-        # splits into lines while removing empty lines and trailing spaces
-        lines = [s.strip() for s in re.split("[\r\n]", string) if bool(s)]
+    @staticmethod
+    def __split_lines(raw):
+        """Convert raw response bytes into a list of strings.
 
-        return lines
+        splits into lines while removing empty lines and trailing spaces
+        """
+        string = raw.decode("utf-8", "ignore")
+        return [s for s in (line.strip() for line in string.splitlines()) if s]
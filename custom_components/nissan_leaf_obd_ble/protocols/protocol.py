@@ -36,6 +36,9 @@ from ..utils import isHex
 
 logger = logging.getLogger(__name__)
 
+# bytes deleted from a raw line to test that it is all hex digits
+_HEX_DIGITS = b"0123456789abcdefABCDEF"
+
 """
 
 Basic data models for all protocols to use
@@ -102,8 +105,8 @@ class Protocol:
     They are largely stateless, with the exception of an ECU tagging system, which
     is initialized by passing the response to an "0100" command.
 
-    Protocols are __called__ with a list of string responses, and return a
-    list of Messages.
+    Protocols are __called__ with a list of string responses (or the raw
+    response bytes), and return a list of Messages.
     """
 
     # override in subclass for each protocol
@@ -121,9 +124,9 @@ class Protocol:
     def __call__(self, lines):
         """Perform main function.
 
-        accepts a list of raw strings from the car, split by lines
+        accepts a list of raw strings from the car, split by lines,
+        or the raw bytes of the response
         """
-
         # ---------------------------- preprocess ----------------------------
 
         # Non-hex (non-OBD) lines shouldn't go through the big parsers,
@@ -132,13 +135,27 @@ class Protocol:
         obd_lines = []
         non_obd_lines = []
 
-        for line in lines:
-            line_no_spaces = line.replace(" ", "")
-
-            if isHex(line_no_spaces):
-                obd_lines.append(line_no_spaces)
-            else:
-                non_obd_lines.append(line)  # pass the original, un-scrubbed line
+        if isinstance(lines, (bytes, bytearray)):
+            # raw response: sort the byte lines, only decoding the ones kept
+            for line in lines.splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                line_no_spaces = line.replace(b" ", b"")
+
+                if not line_no_spaces.translate(None, _HEX_DIGITS):
+                    obd_lines.append(line_no_spaces.decode())
+                else:
+                    # pass the original, un-scrubbed line
+                    non_obd_lines.append(line.decode("utf-8", "ignore"))
+        else:
+            for line in lines:
+                line_no_spaces = line.replace(" ", "")
+
+                if isHex(line_no_spaces):
+                    obd_lines.append(line_no_spaces)
+                else:
+                    non_obd_lines.append(line)  # pass the original, un-scrubbed line
 
         # ---------------------- handle valid OBD lines ----------------------
 